@@ -3,8 +3,14 @@
 import streamlit as st
 import os
 import re
+import hashlib
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import phonenumbers
 from datetime import datetime
 from dotenv import load_dotenv
@@ -12,7 +18,6 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 import smtplib
-import tempfile
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 from io import BytesIO
@@ -30,13 +35,15 @@ EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_USER = os.getenv("EMAIL_ADDRESS")
 EMAIL_PASS = os.getenv("EMAIL_PASSWORD")
 
+_VALID_EMAIL_RE = re.compile(r"^[\w\.-]+@[\w\.-]+\.\w+$")
+
 # ------------------------------
 # Validators
 # ------------------------------
 
 
 def validate_email(email):
-    return re.match(r"^[\w\.-]+@[\w\.-]+\.\w+$", email) is not None
+    return _VALID_EMAIL_RE.match(email) is not None
 
 
 def validate_phone(phone, country_code="US"):
@@ -46,59 +53,157 @@ def validate_phone(phone, country_code="US"):
     except phonenumbers.NumberParseException:
         return False
 
+
+@st.cache_resource
+def warm_phone_metadata(country_codes=("US", "IN", "GB")):
+    # phonenumbers loads region metadata lazily on first use; pay that off the UI thread
+    def _warm():
+        for code in country_codes:
+            example = phonenumbers.example_number(code)
+            if example is not None:
+                validate_phone(phonenumbers.format_number(
+                    example, phonenumbers.PhoneNumberFormat.NATIONAL), code)
+
+    thread = threading.Thread(target=_warm, daemon=True)
+    thread.start()
+    return thread
+
 # ------------------------------
 # Database
 # ------------------------------
 
 
+@st.cache_resource
+def get_db_connection():
+    # One connection shared by every rerun and session; writers hold _db_lock()
+    return sqlite3.connect("candidates.db", check_same_thread=False)
+
+
+@st.cache_resource
+def _db_lock():
+    return threading.Lock()
+
+
+@st.cache_resource
 def init_db():
-    conn = sqlite3.connect("candidates.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS candidates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT, email TEXT, phone TEXT, 
-            exp INTEGER, position TEXT, location TEXT,
-            tech_stack TEXT, consent TEXT, timestamp TEXT
-        )
-    ''')
-    # Add 'country' column if it doesn't exist
-    try:
-        cursor.execute("ALTER TABLE candidates ADD COLUMN country TEXT")
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-    conn.commit()
-    conn.close()
+    # Schema setup only needs to run once per process, not on every rerun
+    conn = get_db_connection()
+    with _db_lock(), conn:
+        cursor = conn.cursor()
+        # WAL + NORMAL sync: one fsync per checkpoint rather than per commit
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS candidates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT, email TEXT, phone TEXT, 
+                exp INTEGER, position TEXT, location TEXT,
+                tech_stack TEXT, consent TEXT, timestamp TEXT
+            )
+        ''')
+        # Add 'country' column if it doesn't exist
+        try:
+            cursor.execute("ALTER TABLE candidates ADD COLUMN country TEXT")
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_candidates_email ON candidates(email)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS prompt_cache (
+                prompt_hash TEXT PRIMARY KEY, response TEXT
+            )
+        ''')
 
 
-def save_candidate_data(data):
-    conn = sqlite3.connect("candidates.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO candidates (name, email, phone, exp, position, location, country, tech_stack, consent, timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+_INSERT_CANDIDATE_SQL = '''
+    INSERT INTO candidates (name, email, phone, exp, position, location, country, tech_stack, consent, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def _candidate_row(data):
+    return (
         data["name"], data["email"], data["phone"], data["exp"],
         data["position"], data["location"], data["country"],
         data["tech_stack"], data["consent"], data["timestamp"]
-    ))
-    conn.commit()
-    conn.close()
+    )
+
+
+def save_candidate_data(data):
+    conn = get_db_connection()
+    with _db_lock(), conn:
+        conn.execute(_INSERT_CANDIDATE_SQL, _candidate_row(data))
+
+
+def save_candidates_bulk(candidates):
+    # Single transaction, so N rows cost one commit
+    conn = get_db_connection()
+    with _db_lock(), conn:
+        conn.executemany(_INSERT_CANDIDATE_SQL, map(_candidate_row, candidates))
 
 
 def delete_user_data(email):
-    conn = sqlite3.connect("candidates.db")
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM candidates WHERE email = ?", (email,))
-    conn.commit()
-    conn.close()
+    conn = get_db_connection()
+    with _db_lock(), conn:
+        conn.execute("DELETE FROM candidates WHERE email = ?", (email,))
 
 # ------------------------------
 # Email with PDF
 # ------------------------------
 
 
-def send_email_with_questions(to_email, questions, candidate_name):
+@st.cache_resource
+def get_email_pool():
+    return ThreadPoolExecutor(max_workers=2)
+
+
+@st.cache_resource
+def get_smtp_holder():
+    # Long-lived SMTP session shared by the email workers; smtplib is not thread-safe.
+    # Fetch it on the script thread: workers have no ScriptRunContext for st caches.
+    return {"client": None, "lock": threading.Lock()}
+
+
+SMTP_TIMEOUT = 30
+
+
+def _connect_smtp():
+    # The timeout bounds every socket op, so a silently dropped connection can't hang the lock
+    smtp = smtplib.SMTP_SSL(EMAIL_HOST, 465, timeout=SMTP_TIMEOUT)
+    smtp.login(EMAIL_USER, EMAIL_PASS)
+    return smtp
+
+
+def _smtp_alive(smtp):
+    try:
+        return smtp.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def _reconnect_smtp(holder):
+    if holder["client"] is not None:
+        try:
+            holder["client"].close()
+        except OSError:
+            pass
+    holder["client"] = _connect_smtp()
+
+
+def _send_smtp_message(message, holder):
+    with holder["lock"]:
+        if holder["client"] is None or not _smtp_alive(holder["client"]):
+            _reconnect_smtp(holder)
+        try:
+            holder["client"].send_message(message)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # ssl.SSLError and connection resets are OSErrors too; retry once on a fresh session
+            _reconnect_smtp(holder)
+            holder["client"].send_message(message)
+
+
+def send_email_with_questions(to_email, questions, candidate_name, pdf_bytes, smtp_holder):
+    # Runs on get_email_pool(), so it must not touch st.*; errors surface through the Future
     subject = "Your Generated Interview Questions"
     body_text = f"Dear {candidate_name or 'Candidate'},\n\nHere are your generated interview questions:\n\n{questions}"
 
@@ -108,68 +213,151 @@ def send_email_with_questions(to_email, questions, candidate_name):
     message["Subject"] = subject
     message.attach(MIMEText(body_text, "plain"))
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_pdf:
-        pdf_path = tmp_pdf.name
-
-    doc = SimpleDocTemplate(pdf_path)
-    styles = getSampleStyleSheet()
-    elements = [Paragraph("Generated Interview Questions",
-                          styles['Title']), Spacer(1, 12)]
-    for q in questions.split("\n"):
-        if q.strip():
-            elements.append(Paragraph(q.strip(), styles['Normal']))
-            elements.append(Spacer(1, 6))
-    doc.build(elements)
+    pdf_attachment = MIMEApplication(pdf_bytes, _subtype="pdf")
+    pdf_attachment.add_header(
+        'Content-Disposition', 'attachment', filename="questions.pdf")
+    message.attach(pdf_attachment)
 
-    with open(pdf_path, "rb") as file:
-        pdf_attachment = MIMEApplication(file.read(), _subtype="pdf")
-        pdf_attachment.add_header(
-            'Content-Disposition', 'attachment', filename="questions.pdf")
-        message.attach(pdf_attachment)
+    _send_smtp_message(message, smtp_holder)
+
+
+# Connect, login, NOOP and a retried send are each bounded by SMTP_TIMEOUT
+EMAIL_SEND_DEADLINE = 4 * SMTP_TIMEOUT
 
-    try:
-        with smtplib.SMTP_SSL(EMAIL_HOST, 465) as smtp:
-            smtp.login(EMAIL_USER, EMAIL_PASS)
-            smtp.send_message(message)
-        return True
-    except Exception as e:
-        st.error(f"Failed to send email: {e}")
-        return False
-    finally:
-        os.unlink(pdf_path)
+
+def email_send_expired():
+    submitted_at = st.session_state.get("email_submitted_at")
+    return submitted_at is not None and time.monotonic() - submitted_at > EMAIL_SEND_DEADLINE
+
+
+@st.fragment(run_every=1)
+def poll_email_status():
+    # Re-polls the pending send every second; a full rerun then renders the outcome
+    email_future = st.session_state.get("email_future")
+    if email_future is None or email_future.done() or email_send_expired():
+        st.rerun()
+    st.info("Sending email...")
 
 # ------------------------------
 # GPT Generator
 # ------------------------------
 
 
-def ask_gpt(prompt):
-    headers = {
+LLM_MODEL = "accounts/fireworks/models/llama-v3p1-8b-instruct"
+QUESTION_SETS_PER_CALL = 3
+
+
+def _prompt_hash(prompt):
+    return hashlib.sha256(f"{LLM_MODEL}\n{prompt}".encode()).hexdigest()
+
+
+@st.cache_resource
+def get_http_session():
+    # Keep-alive pool so repeat calls skip the TCP/TLS handshake
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    session.headers.update({
         "Authorization": f"Bearer {MISTRAL_API_KEY}",
         "Content-Type": "application/json"
-    }
+    })
+    return session
+
+
+def ask_gpt(prompt, use_cache=True, on_update=None, n=1):
+    # Returns the first completion plus any others that finished; a cache hit returns just
+    # the cached one.
+    # use_cache=False forces a fresh completion (Regenerate); it still refreshes the cache.
+    # on_update is called with the text so far of the first completion as tokens arrive.
+    conn = get_db_connection()
+    prompt_hash = _prompt_hash(prompt)
+    if use_cache:
+        row = conn.execute(
+            "SELECT response FROM prompt_cache WHERE prompt_hash = ?", (prompt_hash,)).fetchone()
+        if row and row[0]:
+            return [row[0]]
+
     payload = {
-        "model": "accounts/fireworks/models/llama-v3p1-8b-instruct",
-        "messages": [{"role": "user", "content": prompt}]
+        "model": LLM_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "stream": True,
+        "n": n
     }
-    response = requests.post(MISTRAL_API_URL, json=payload, headers=headers)
-    response.raise_for_status()
-    return response.json()['choices'][0]['message']['content']
+    contents = [""] * n
+    finish_reasons = [None] * n
+    with get_http_session().post(MISTRAL_API_URL, json=payload, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith(b"data: "):
+                continue
+            chunk = line[len(b"data: "):]
+            if chunk == b"[DONE]":
+                break
+            for choice in orjson.loads(chunk)['choices']:
+                index = choice.get('index', 0)
+                if choice.get('finish_reason'):
+                    finish_reasons[index] = choice['finish_reason']
+                delta = choice['delta'].get('content')
+                if delta:
+                    contents[index] += delta
+                    if index == 0 and on_update is not None:
+                        on_update(contents[0])
+
+    # Only "stop" is a complete answer; a dropped stream or "length" cut-off must not be cached
+    if finish_reasons[0] != "stop":
+        raise RuntimeError(
+            f"LLM completion did not finish (finish_reason={finish_reasons[0]})")
+    if contents[0]:
+        with _db_lock(), conn:
+            conn.execute("INSERT OR REPLACE INTO prompt_cache (prompt_hash, response) VALUES (?, ?)",
+                         (prompt_hash, contents[0]))
+    # Extra choices still streaming when the connection closed are dropped, not pooled
+    return [contents[0]] + [
+        content for content, reason in zip(contents[1:], finish_reasons[1:])
+        if reason == "stop" and content]
+
+
+@st.cache_resource
+def get_pdf_styles():
+    # ReportLab rebuilds the whole registry on each call; build it once per process
+    return getSampleStyleSheet()
 
 
 def generate_pdf_bytes(questions_text: str) -> bytes:
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = [Paragraph("Generated Interview Questions",
-                          styles["Title"]), Spacer(1, 12)]
-    for line in questions_text.strip().split('\n'):
-        if line.strip():
-            elements.append(Paragraph(line.strip(), styles["Normal"]))
-            elements.append(Spacer(1, 6))
+    styles = get_pdf_styles()
+    # One Paragraph for the whole body instead of a Paragraph + Spacer per line
+    lines = [line.strip() for line in questions_text.split('\n') if line.strip()]
+    elements = [Paragraph("Generated Interview Questions", styles["Title"]),
+                Spacer(1, 12),
+                Paragraph("<br/><br/>".join(lines), styles["Normal"])]
     doc.build(elements)
-    buffer.seek(0)
-    return buffer.read()
+    return buffer.getvalue()
+
+
+def get_questions_pdf(questions_text):
+    # Build once per question set; Download and Email Me share the bytes
+    key = hashlib.sha256(questions_text.encode()).hexdigest()
+    cached = st.session_state.get("pdf_bytes")
+    if cached is None or cached[0] != key:
+        cached = (key, generate_pdf_bytes(questions_text))
+        st.session_state["pdf_bytes"] = cached
+    return cached[1]
+
+
+# ------------------------------
+# Resume Parsing
+# ------------------------------
+
+
+@st.cache_data(show_spinner=False, ttl=600, max_entries=32)
+def process_resume(file_bytes: bytes, file_name: str):
+    # Keyed on content, so widget reruns don't re-parse the same upload. Bounded and
+    # short-lived: it holds personal data shared across sessions.
+    buffer = BytesIO(file_bytes)
+    buffer.name = file_name
+    text = extract_resume_text(buffer)
+    return extract_skills_and_role_from_text(text)
 
 
 # ------------------------------
@@ -179,6 +367,7 @@ st.set_page_config(page_title="🤖 TalentScout")
 st.title("🤖 TalentScout Hiring Assistant")
 
 init_db()
+warm_phone_metadata()
 
 with st.expander("🔐 GDPR Privacy Notice"):
     st.markdown(
@@ -187,8 +376,8 @@ with st.expander("🔐 GDPR Privacy Notice"):
 resume_file = st.file_uploader(
     "📤 Upload Your Resume (PDF or TXT)", type=["pdf", "txt"])
 if resume_file:
-    text = extract_resume_text(resume_file)
-    skills, role, extracted_email = extract_skills_and_role_from_text(text)
+    skills, role, extracted_email = process_resume(
+        resume_file.getvalue(), resume_file.name)
     role = role or ""
     extracted_email = extracted_email or ""
 
@@ -261,28 +450,47 @@ if st.session_state.stage == 'generate_questions':
     techs = extract_tech_keywords(data["tech_stack"])
     prompt = generate_questions_prompt(techs, data["position"])
 
-    if 'generated_questions' not in st.session_state:
+    # Only ask again when the prompt itself changes, not on incidental reruns
+    prompt_hash = _prompt_hash(prompt)
+    if st.session_state.get('questions_prompt_hash') != prompt_hash:
+        stream_box = st.empty()
         try:
-            st.session_state.generated_questions = ask_gpt(prompt)
+            # Extra completions are kept so Regenerate can serve them without a round trip
+            choices = ask_gpt(
+                prompt, use_cache=not st.session_state.pop('force_regenerate', False),
+                on_update=stream_box.markdown, n=QUESTION_SETS_PER_CALL)
+            st.session_state.generated_questions = choices[0]
+            st.session_state.question_pool = [c for c in choices[1:] if c]
         except Exception as e:
             st.error(f"Failed to generate questions: {e}")
             st.stop()
+        stream_box.empty()
+        st.session_state.questions_prompt_hash = prompt_hash
 
     questions_text = st.session_state.generated_questions
     st.success("Here are your interview questions:")
     st.write(questions_text)
 
+    pdf_bytes = get_questions_pdf(questions_text)
+
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         if st.button("🔁 Regenerate"):
-            st.session_state.generated_questions = ask_gpt(prompt)
+            if st.session_state.get('question_pool'):
+                st.session_state.generated_questions = st.session_state.question_pool.pop(0)
+            else:
+                # Re-run through the streaming path above, skipping the prompt cache
+                st.session_state.questions_prompt_hash = None
+                st.session_state.force_regenerate = True
             st.rerun()
     with col2:
         if st.button("📧 Email Me"):
-            if send_email_with_questions(data["email"], questions_text, data["name"]):
-                st.success("Email sent successfully!")
+            st.session_state.email_future = get_email_pool().submit(
+                send_email_with_questions, data["email"], questions_text, data["name"],
+                pdf_bytes, get_smtp_holder())
+            st.session_state.email_submitted_at = time.monotonic()
+            st.toast("📧 Sending your questions...")
     with col3:
-        pdf_bytes = generate_pdf_bytes(questions_text)
         st.download_button(
             label="📄 Download PDF",
             data=pdf_bytes,
@@ -294,16 +502,30 @@ if st.session_state.stage == 'generate_questions':
             st.success("Thank you! We'll be in touch.")
             st.session_state.stage = 'end'
 
+# --- Email Status ---
+# Shown outside the stage blocks so the result still appears after Finish
+email_future = st.session_state.get("email_future")
+if email_future is not None:
+    if email_future.done():
+        if email_future.exception() is not None:
+            st.error(f"Failed to send email: {email_future.exception()}")
+        else:
+            st.success("Email sent successfully!")
+        del st.session_state.email_future, st.session_state.email_submitted_at
+    elif email_send_expired():
+        # Stop polling; the worker is left to finish or fail on its own
+        st.error("Failed to send email: the mail server did not respond in time.")
+        del st.session_state.email_future, st.session_state.email_submitted_at
+    else:
+        poll_email_status()
+
 # --- Deletion Section ---
 with st.expander("🧹 Request Data Deletion"):
     delete_email = st.text_input("Enter your email to delete your data")
     if st.button("Delete My Data"):
         if validate_email(delete_email):
             delete_user_data(delete_email)
+            process_resume.clear()
             st.success("Your data has been deleted.")
         else:
             st.warning("Enter a valid email.")
-
-
-# Initialize DB
-init_db()
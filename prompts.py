@@ -1,9 +1,7 @@
-def generate_questions_prompt(skills, role):
-    skill_string = ", ".join(skills)
-    return f"""
+_PROMPT_TMPL = """
 You are an AI technical interviewer.
 
-Generate **10 technical interview questions** for a candidate applying for the role of **{role}** with the following skills: {skill_string}.
+Generate **10 technical interview questions** for a candidate applying for the role of **{role}** with the following skills: {skills}.
 
 For each question, also provide a **detailed, accurate answer**. Format your response exactly like this:
 
@@ -14,4 +12,8 @@ Q2: <question 2>
 A2: <answer 2>
 
 ...and so on up to Q10.
-"""
+""".format
+
+
+def generate_questions_prompt(skills, role):
+    return _PROMPT_TMPL(role=role, skills=", ".join(skills))
@@ -1,27 +1,34 @@
 import re
 from PyPDF2 import PdfReader
 
+_ROLE_RE = re.compile(r"(developer|engineer|manager|analyst|architect)", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+
+_TECH_KEYWORDS = ["Python", "Java", "JavaScript", "React", "Node", "AWS", "Docker", "Kubernetes", "SQL", "Git"]
+_TECH_CANON = {kw.lower(): kw for kw in _TECH_KEYWORDS}
+_TECH_RE = re.compile(r"\b(" + "|".join(_TECH_KEYWORDS) + r")\b", re.IGNORECASE)
+
 def extract_resume_text(file):
     if file.name.endswith(".pdf"):
         reader = PdfReader(file)
-        return " ".join([page.extract_text() or "" for page in reader.pages])
+        if len(reader.pages) == 1:
+            return reader.pages[0].extract_text() or ""
+        return " ".join(page.extract_text() or "" for page in reader.pages)
     else:
         return file.read().decode("utf-8")
 
 def extract_tech_keywords(text):
-    keywords = ["Python", "Java", "JavaScript", "React", "Node", "AWS", "Docker", "Kubernetes", "SQL", "Git"]
-    found = [kw for kw in keywords if kw.lower() in text.lower()]
-    return list(set(found))
+    return list({_TECH_CANON[m.lower()] for m in _TECH_RE.findall(text)})
 
 def extract_skills_and_role_from_text(text):
     skills = extract_tech_keywords(text)
     
     # Extract role
-    role_match = re.search(r"(developer|engineer|manager|analyst|architect)", text, re.IGNORECASE)
+    role_match = _ROLE_RE.search(text)
     role = role_match.group(0).title() if role_match else "Software Engineer"
 
     # Extract email
-    email_match = re.search(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+", text)
+    email_match = _EMAIL_RE.search(text)
     extracted_email = email_match.group(0) if email_match else ""
 
     return skills, role, extracted_email